@@ -1,18 +1,24 @@
+import asyncio
 import json
 import logging
-import math
 import os
-import re
-from datetime import datetime, timedelta
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple, Union
 
 import httpx
+import orjson
+import redis.asyncio as aioredis
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from app.parsing import as_position_array, extract_coordinates, is_valid_position, load_json, valid_mask
 
 # Configure logging
 logging.basicConfig(
@@ -21,7 +27,73 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="WindBorne Balloon Tracker")
+# Base URL for the WindBorne API
+BASE_URL = "https://a.windbornesystems.com/treasure"
+
+# (positions, is_corrupted, error_type, error_message)
+BalloonResult = Tuple[Optional[List[List[float]]], bool, Optional[str], Optional[str]]
+
+# Seconds a cached hour stays fresh. The current hour may still be updated
+# upstream; older hours only change when the UTC hour rolls over.
+CURRENT_HOUR_TTL = 60.0
+PAST_HOUR_TTL = 3600.0
+
+# Error types that may succeed on retry and are therefore never cached
+_TRANSIENT_ERRORS = {"http_error", "request_error", "unknown_error"}
+
+# hour -> (UTC hour bucket, monotonic time stored, result)
+_CACHE: Dict[int, Tuple[str, float, BalloonResult]] = {}
+
+# Upper bound on concurrent requests to the WindBorne API
+MAX_UPSTREAM_REQUESTS = 8
+
+# Seconds to wait on Redis before treating the cache as unavailable
+REDIS_TIMEOUT = 0.5
+
+
+def _init_state(state) -> None:
+    """
+    Create the shared HTTP client, the upstream concurrency limit and the
+    in-flight fetch map, plus a Redis connection for the cross-worker cache
+    when REDIS_URL is set. All of these belong to the running event loop.
+    """
+    state.loop = asyncio.get_running_loop()
+    # All hourly files live on one host, so HTTP/2 multiplexes every
+    # request over a single TLS connection
+    state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=8, max_connections=16, keepalive_expiry=30),
+    )
+    redis_url = os.environ.get("REDIS_URL")
+    # Short timeouts so a stalled Redis degrades to direct upstream fetches
+    state.redis = aioredis.Redis.from_url(
+        redis_url,
+        socket_connect_timeout=REDIS_TIMEOUT,
+        socket_timeout=REDIS_TIMEOUT,
+    ) if redis_url else None
+    state.upstream_semaphore = asyncio.Semaphore(MAX_UPSTREAM_REQUESTS)
+    # hour -> task currently fetching it, awaited by every concurrent caller
+    state.inflight = {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Share one pooled HTTP client across all requests to the WindBorne API"""
+    _init_state(app.state)
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        if app.state.redis is not None:
+            await app.state.redis.aclose()
+
+
+app = FastAPI(
+    title="WindBorne Balloon Tracker",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Determine static and template directories based on environment
 static_dir = os.environ.get("STATIC_DIR", "app/static")
@@ -33,9 +105,6 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 # Set up templates
 templates = Jinja2Templates(directory=templates_dir)
 
-# Base URL for the WindBorne API
-BASE_URL = "https://a.windbornesystems.com/treasure"
-
 
 class BalloonData(BaseModel):
     positions: List[List[float]]
@@ -45,47 +114,103 @@ class BalloonData(BaseModel):
     error_message: Optional[str] = None
 
 
-def extract_coordinates_from_text(text: str) -> List[List[float]]:
+def _cache_bucket() -> str:
+    """Current UTC hour, which determines what each hourly file contains"""
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H")
+
+
+async def _redis_get(redis_client: aioredis.Redis, key: str) -> Optional[BalloonResult]:
+    """
+    Read a cached result from Redis, treating any Redis failure or
+    unreadable value as a miss
+    """
+    try:
+        cached = await redis_client.get(key)
+    except RedisError as e:
+        logger.warning(f"Redis read failed for {key}: {e}")
+        return None
+    if cached is None:
+        return None
+    
+    try:
+        result = orjson.loads(cached)
+    except orjson.JSONDecodeError as e:
+        logger.warning(f"Ignoring undecodable Redis value for {key}: {e}")
+        return None
+    if not isinstance(result, list) or len(result) != 4:
+        logger.warning(f"Ignoring unexpected Redis value for {key}")
+        return None
+    return tuple(result)
+
+
+async def _redis_set(redis_client: aioredis.Redis, key: str, result: BalloonResult, ttl: float) -> None:
+    """Store a result in Redis, ignoring Redis failures"""
+    try:
+        await redis_client.set(key, orjson.dumps(result), ex=int(ttl))
+    except RedisError as e:
+        logger.warning(f"Redis write failed for {key}: {e}")
+
+
+async def fetch_balloon_data(
+    hour: int,
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    inflight: Dict[int, asyncio.Task],
+    redis_client: Optional[aioredis.Redis] = None,
+) -> BalloonResult:
     """
-    Extract valid coordinate triplets from text using regex pattern matching.
-    This bypasses JSON parsing errors by directly finding patterns that match
-    the expected coordinate format.
+    Fetch balloon position data, serving it from the in-process cache or
+    Redis while fresh
     
     Args:
-        text: The raw text to extract coordinates from
+        hour: Hours ago (0-23)
+        client: Shared HTTP client used on a cache miss
+        semaphore: Limit on concurrent requests to the WindBorne API
+        inflight: Map of hour to the task currently fetching it
+        redis_client: Optional Redis connection shared between workers
         
     Returns:
-        List of valid coordinate triplets [lat, lng, altitude]
+        Tuple of (data, is_corrupted, error_type, error_message)
     """
-    # Pattern to match [float, float, float] coordinate triplets
-    pattern = r'\[\s*([-+]?\d*\.?\d+)\s*,\s*([-+]?\d*\.?\d+)\s*,\s*([-+]?\d*\.?\d+)\s*\]'
+    bucket = _cache_bucket()
+    ttl = CURRENT_HOUR_TTL if hour == 0 else PAST_HOUR_TTL
     
-    matches = re.findall(pattern, text)
-    coordinates = []
+    cached = _CACHE.get(hour)
+    if cached and cached[0] == bucket and time.monotonic() - cached[1] < ttl:
+        return cached[2]
     
-    for match in matches:
-        try:
-            # Convert string matches to floats
-            lat = float(match[0])
-            lng = float(match[1])
-            alt = float(match[2])
-            
-            # Validate coordinates
-            if -90 <= lat <= 90 and -180 <= lng <= 180 and alt > 0 and math.isfinite(lat) and math.isfinite(lng) and math.isfinite(alt):
-                coordinates.append([lat, lng, alt])
-        except (ValueError, TypeError):
-            # Skip any conversion errors
-            pass
+    # Coalesce concurrent misses for the same hour into a single fetch
+    task = inflight.get(hour)
+    if task is None:
+        task = asyncio.create_task(_fetch_and_cache(hour, client, semaphore, redis_client, bucket, ttl))
+        inflight[hour] = task
+        task.add_done_callback(lambda _: inflight.pop(hour, None))
+    # Shield so one cancelled caller does not cancel the fetch for the others
+    return await asyncio.shield(task)
+
+
+async def _fetch_and_cache(hour: int, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, redis_client: Optional[aioredis.Redis], bucket: str, ttl: float) -> BalloonResult:
+    """Resolve a cache miss from Redis or the WindBorne API and store the result"""
+    key = f"balloon:{bucket}:{hour:02d}"
+    result = await _redis_get(redis_client, key) if redis_client is not None else None
+    if result is None:
+        result = await _fetch_balloon_data(hour, client, semaphore)
+        if redis_client is not None and result[2] not in _TRANSIENT_ERRORS:
+            await _redis_set(redis_client, key, result, ttl)
     
-    return coordinates
+    if result[2] not in _TRANSIENT_ERRORS:
+        _CACHE[hour] = (bucket, time.monotonic(), result)
+    return result
 
 
-async def fetch_balloon_data(hour: int) -> Tuple[Optional[List[List[float]]], bool, Optional[str], Optional[str]]:
+async def _fetch_balloon_data(hour: int, client: httpx.AsyncClient, semaphore: asyncio.Semaphore) -> BalloonResult:
     """
     Fetch balloon position data from the WindBorne API
     
     Args:
         hour: Hours ago (0-23)
+        client: Shared HTTP client used to make the request
+        semaphore: Limit on concurrent requests to the WindBorne API
         
     Returns:
         Tuple of (data, is_corrupted, error_type, error_message)
@@ -93,75 +218,59 @@ async def fetch_balloon_data(hour: int) -> Tuple[Optional[List[List[float]]], bo
     url = f"{BASE_URL}/{hour:02d}.json"
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with semaphore:
             response = await client.get(url)
-            response.raise_for_status()
-            
-            # Get the raw text content
-            raw_content = response.text
+        response.raise_for_status()
+        
+        # First try standard JSON parsing
+        try:
+            data = load_json(response.content)
             
-            # First try standard JSON parsing
-            try:
-                data = response.json()
-                
-                # Validate data structure
-                if not isinstance(data, list):
-                    logger.warning(f"Data at {url} is not a list")
-                    # Fall back to regex extraction
-                    extracted_coords = extract_coordinates_from_text(raw_content)
-                    if extracted_coords:
-                        logger.info(f"Extracted {len(extracted_coords)} coordinates using regex from {url}")
-                        return extracted_coords, False, "json_extracted", f"Extracted {len(extracted_coords)} coordinates from invalid JSON format"
-                    else:
-                        return None, True, "format_error", "Data is not in the expected list format"
-                
-                # Check for valid coordinates and filter out invalid ones
-                valid_positions = []
-                corrupted_count = 0
-                
-                for item in data:
-                    valid_coords = True
-                    
-                    if not isinstance(item, list) or len(item) != 3:
-                        corrupted_count += 1
-                        continue
-                    
-                    # Check that all values are finite numbers
-                    for coord in item:
-                        if not isinstance(coord, (int, float)) or not math.isfinite(coord):
-                            valid_coords = False
-                            corrupted_count += 1
-                            break
-                    
-                    if valid_coords and -90 <= item[0] <= 90 and -180 <= item[1] <= 180 and item[2] > 0:
-                        valid_positions.append(item)
-                    else:
-                        corrupted_count += 1
-                
-                # If we have no valid positions, consider the data corrupted
-                if not valid_positions:
-                    logger.warning(f"No valid positions found in {url}")
-                    return None, True, "all_corrupted", "All coordinates in the data are corrupted"
-                
-                # If we have some valid and some corrupted, return partial data
-                if corrupted_count > 0:
-                    logger.info(f"Found {corrupted_count} corrupted coordinates in {url}")
-                    return valid_positions, False, "partial_corruption", f"{corrupted_count} coordinates were corrupted and filtered out"
-                    
-                return valid_positions, False, None, None
-                
-            except json.JSONDecodeError as e:
-                # JSON parsing failed, try regex extraction
-                logger.error(f"JSON decode error for {url}: {e}")
-                
-                # Try to extract coordinates using regex
-                extracted_coords = extract_coordinates_from_text(raw_content)
+            # Validate data structure
+            if not isinstance(data, list):
+                logger.warning(f"Data at {url} is not a list")
+                # Fall back to extraction from the raw body
+                extracted_coords = extract_coordinates(response.content)
                 if extracted_coords:
                     logger.info(f"Extracted {len(extracted_coords)} coordinates using regex from {url}")
                     return extracted_coords, False, "json_extracted", f"Extracted {len(extracted_coords)} coordinates from invalid JSON format"
                 else:
-                    return None, True, "json_error", f"Invalid JSON format: {str(e)}"
+                    return None, True, "format_error", "Data is not in the expected list format"
+            
+            # Check for valid coordinates and filter out invalid ones
+            arr = as_position_array(data)
+            if arr is not None:
+                # Uniform numeric data: filter all positions in one vectorized pass
+                mask = valid_mask(arr[:, 0], arr[:, 1], arr[:, 2])
+                valid_positions = arr[mask].tolist()
+            else:
+                valid_positions = [item for item in data if is_valid_position(item)]
+            corrupted_count = len(data) - len(valid_positions)
+            
+            # If we have no valid positions, consider the data corrupted
+            if not valid_positions:
+                logger.warning(f"No valid positions found in {url}")
+                return None, True, "all_corrupted", "All coordinates in the data are corrupted"
             
+            # If we have some valid and some corrupted, return partial data
+            if corrupted_count > 0:
+                logger.info(f"Found {corrupted_count} corrupted coordinates in {url}")
+                return valid_positions, False, "partial_corruption", f"{corrupted_count} coordinates were corrupted and filtered out"
+                
+            return valid_positions, False, None, None
+            
+        except json.JSONDecodeError as e:
+            # JSON parsing failed, try regex extraction
+            logger.error(f"JSON decode error for {url}: {e}")
+            
+            # Try to extract coordinates from the raw body
+            extracted_coords = extract_coordinates(response.content)
+            if extracted_coords:
+                logger.info(f"Extracted {len(extracted_coords)} coordinates using regex from {url}")
+                return extracted_coords, False, "json_extracted", f"Extracted {len(extracted_coords)} coordinates from invalid JSON format"
+            else:
+                return None, True, "json_error", f"Invalid JSON format: {str(e)}"
+        
     except httpx.HTTPStatusError as e:
         status_code = e.response.status_code
         if status_code == 404:
@@ -187,56 +296,57 @@ async def index(request: Request):
 
 
 @app.get("/api/balloons")
-async def get_balloon_data():
+async def get_balloon_data(request: Request):
     """
     Fetch balloon data for the last 24 hours
     """
     results = []
     error_hours = []
     
-    for hour in range(24):
-        positions, corrupted, error_type, error_message = await fetch_balloon_data(hour)
-        
-        timestamp = datetime.now() - timedelta(hours=hour)
-        timestamp_str = timestamp.strftime("%Y-%m-%d %H:00:00")
+    # Fetch all hours concurrently
+    state = request.app.state
+    if getattr(state, "loop", None) is not asyncio.get_running_loop():
+        # Servers that skip lifespan events, or run requests on a new event
+        # loop, get fresh shared state bound to the current loop
+        _init_state(state)
+    tasks = [
+        fetch_balloon_data(hour, state.http, state.upstream_semaphore, state.inflight, state.redis)
+        for hour in range(24)
+    ]
+    fetched = await asyncio.gather(*tasks, return_exceptions=True)
+    now = datetime.now()
+    timestamps = [(now - timedelta(hours=hour)).strftime("%Y-%m-%d %H:00:00") for hour in range(24)]
+    
+    for hour, result in enumerate(fetched):
+        if isinstance(result, Exception):
+            logger.error(f"Unexpected error when fetching hour {hour}: {result}")
+            result = (None, True, "unknown_error", f"Unexpected error: {str(result)}")
+        positions, corrupted, error_type, error_message = result
         
-        if corrupted:
+        if corrupted or error_type:
             error_hours.append({
                 "hour": hour,
                 "type": error_type,
                 "message": error_message
             })
-            
-            results.append({
-                "positions": [],
-                "timestamp": timestamp_str,
-                "corrupted": True,
-                "error_type": error_type,
-                "error_message": error_message
-            })
-        else:
-            error_info = None
-            if error_type:
-                error_info = {
-                    "hour": hour,
-                    "type": error_type,
-                    "message": error_message
-                }
-                error_hours.append(error_info)
-            
-            results.append({
-                "positions": positions,
-                "timestamp": timestamp_str,
-                "corrupted": False,
-                "error_type": error_type,
-                "error_message": error_message
-            })
+        
+        results.append({
+            "positions": [] if corrupted else positions,
+            "timestamp": timestamps[hour],
+            "corrupted": corrupted,
+            "error_type": error_type,
+            "error_message": error_message
+        })
     
-    return {
+    # The payload only holds plain JSON types, so hand it straight to orjson
+    # rather than letting FastAPI walk every coordinate with jsonable_encoder
+    return ORJSONResponse({
         "data": results,
         "error_hours": error_hours
-    }
+    })
 
 
 if __name__ == "__main__":
+    # Run from the repository root as `python -m app.main` so the app
+    # package (and app.parsing) is importable
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Coordinate parsing and validation shared by the web app and the data scripts.
+"""
+
+import json
+import math
+import re
+from array import array
+from typing import List, Optional
+
+import numpy as np
+import orjson
+
+# Pattern to match [float, float, float] coordinate triplets
+# This handles numbers with/without decimal places and negative numbers
+_COORD_RE = re.compile(rb'\[\s*([-+]?\d*\.?\d+)\s*,\s*([-+]?\d*\.?\d+)\s*,\s*([-+]?\d*\.?\d+)\s*\]')
+
+
+def load_json(content: bytes):
+    """
+    Parse JSON with orjson, falling back to the standard library parser.
+    orjson rejects NaN/Infinity literals, which the upstream occasionally
+    emits; the fallback keeps those files parseable so the bad positions
+    can be filtered out individually.
+    """
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        return json.loads(content)
+
+
+def drop_non_finite(data: list) -> list:
+    """
+    Drop positions holding NaN/Infinity, which orjson would write as null.
+    Other malformed items are kept as they are.
+    """
+    return [
+        item for item in data
+        if not (isinstance(item, list) and any(isinstance(coord, float) and not math.isfinite(coord) for coord in item))
+    ]
+
+
+def valid_mask(lat: np.ndarray, lng: np.ndarray, alt: np.ndarray) -> np.ndarray:
+    """
+    Validate coordinate triplets in one vectorized pass
+    
+    Args:
+        lat, lng, alt: Equal-length float arrays of latitudes, longitudes and altitudes
+        
+    Returns:
+        Boolean mask of positions that are finite and within valid ranges
+    """
+    # Range comparisons are False for NaN and reject infinite latitudes and
+    # longitudes, so only the upper bound on altitude needs an explicit check
+    mask = np.abs(lat) <= 90
+    mask &= np.abs(lng) <= 180
+    mask &= alt > 0
+    mask &= alt < np.inf
+    return mask
+
+
+def is_valid_position(item) -> bool:
+    """
+    Validate a single parsed item that could not take the vectorized path.
+    Specialized for the fixed [lat, lng, alt] shape, so the checks are
+    straight-line comparisons with no inner loop over coordinates.
+    
+    Args:
+        item: One element of the parsed JSON array
+        
+    Returns:
+        True if the item is a list of three finite numbers within valid ranges
+    """
+    if type(item) is not list or len(item) != 3:
+        return False
+    lat, lng, alt = item
+    if not (isinstance(lat, (int, float)) and isinstance(lng, (int, float)) and isinstance(alt, (int, float))):
+        return False
+    # As in valid_mask, the range comparisons also reject NaN and infinities
+    return -90 <= lat <= 90 and -180 <= lng <= 180 and 0 < alt < math.inf
+
+
+def as_position_array(data) -> Optional[np.ndarray]:
+    """
+    Convert parsed JSON to an (N, 3) float array when it is a uniform list of
+    numeric triplets
+    
+    Returns:
+        The array, or None if any item is malformed and needs per-item checks
+    """
+    # Sniff the first item so obviously malformed data skips the conversion
+    first = data[0] if data else None
+    if type(first) is not list or len(first) != 3 or type(first[0]) not in (int, float):
+        return None
+    
+    try:
+        arr = np.array(data)
+    except (TypeError, ValueError):
+        # Ragged nesting
+        return None
+    if arr.ndim != 2 or arr.shape[1] != 3 or arr.dtype.kind not in "if":
+        return None
+    return arr.astype(np.float64, copy=False)
+
+
+def extract_coordinates(content: bytes) -> List[List[float]]:
+    """
+    Extract valid coordinate triplets from a body that is not valid JSON.
+    The outermost bracketed span is parsed as JSON first; failing that, regex
+    pattern matching directly finds patterns that match the expected
+    coordinate format.
+    
+    Args:
+        content: The raw response body to extract coordinates from
+        
+    Returns:
+        List of valid coordinate triplets [lat, lng, altitude]
+    """
+    # Most malformed files are a valid array wrapped in stray characters
+    # (leading newline, trailing '%'), so parse the outermost brackets directly
+    # before scanning the whole body with the regex
+    start, end = content.find(b'['), content.rfind(b']')
+    if 0 <= start < end:
+        try:
+            arr = as_position_array(orjson.loads(content[start:end + 1]))
+        except orjson.JSONDecodeError:
+            arr = None
+        if arr is not None:
+            return arr[valid_mask(arr[:, 0], arr[:, 1], arr[:, 2])].tolist()
+    
+    # Stream matches straight into one float column per coordinate; every
+    # match is a valid float literal, so the conversion cannot fail
+    lat, lng, alt = array('d'), array('d'), array('d')
+    for match in _COORD_RE.finditer(content):
+        lat.append(float(match[1]))
+        lng.append(float(match[2]))
+        alt.append(float(match[3]))
+    
+    lat_arr = np.frombuffer(lat, dtype=np.float64)
+    lng_arr = np.frombuffer(lng, dtype=np.float64)
+    alt_arr = np.frombuffer(alt, dtype=np.float64)
+    mask = valid_mask(lat_arr, lng_arr, alt_arr)
+    return np.stack([lat_arr, lng_arr, alt_arr], axis=1)[mask].tolist()
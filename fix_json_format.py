@@ -5,80 +5,91 @@ Script to fetch and fix the WindBorne API data with multiple format issues:
 2. Trailing '%' character at the end
 """
 
-import json
+import aiofiles
 import httpx
+import json
+import orjson
 import asyncio
 import sys
 from datetime import datetime
 import re
 
+from app.parsing import drop_non_finite, load_json
+
 # Base URL for the WindBorne API
 BASE_URL = "https://a.windbornesystems.com/treasure"
 
-async def fetch_and_fix_json(hour):
+# Pattern of arrays inside arrays, used to diagnose unparseable content
+_DOUBLE_BRACKET_RE = re.compile(rb'\[\s*\[\s*[-0-9.]+\s*,\s*[-0-9.]+\s*,\s*[-0-9.]+\s*\]\s*\]')
+
+async def fetch_and_fix_json(hour, client):
     """
     Fetch data for a specific hour and fix the JSON format issues
     """
     url = f"{BASE_URL}/{hour:02d}.json"
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            print(f"Fetching {url}...")
-            response = await client.get(url)
-            
-            if response.status_code != 200:
-                print(f"❌ Hour {hour:02d}: HTTP error {response.status_code}")
-                return None
-            
-            # Get the raw text content
-            raw_content = response.text
-            
-            # Fix 1: Remove leading/trailing whitespace
-            content = raw_content.strip()
+        print(f"Fetching {url}...")
+        response = await client.get(url)
+        
+        if response.status_code != 200:
+            print(f"❌ Hour {hour:02d}: HTTP error {response.status_code}")
+            return None
+        
+        # Work on the raw bytes, slicing once to the outermost brackets
+        raw_bytes = response.content
+        
+        # Fix 1: Drop anything before the first '[' (e.g. a leading newline),
+        # or add the bracket if it is missing
+        start = raw_bytes.find(b'[')
+        if start < 0:
+            raw_bytes = b'[' + raw_bytes.strip()
+            start = 0
+            print(f"  • Added missing opening bracket")
+        
+        # Fix 2: Drop trailing characters after the last ']', or add it if missing
+        end = raw_bytes.rfind(b']')
+        if end < start:
+            content = raw_bytes[start:].rstrip() + b']'
+            print(f"  • Added missing closing bracket")
+        else:
+            content = raw_bytes[start:end + 1]
+            trailing = len(raw_bytes[end + 1:].strip())
+            if trailing:
+                print(f"  • Removed {trailing} trailing characters after JSON")
+        
+        # Fix 3: Remove any stray '%' characters
+        if b'%' in content:
+            content = content.translate(None, b'%')
+            print(f"  • Removed '%' character(s)")
+        
+        # Try to parse the fixed content
+        try:
+            data = load_json(content)
+            if isinstance(data, list):
+                finite_data = drop_non_finite(data)
+                if len(finite_data) < len(data):
+                    print(f"  • Dropped {len(data) - len(finite_data)} coordinates with NaN/Infinity values")
+                data = finite_data
+            print(f"✅ Hour {hour:02d}: Successfully parsed {len(data)} coordinates")
+            return data
+        except json.JSONDecodeError as e:
+            print(f"❌ Hour {hour:02d}: JSON parsing failed: {e}")
             
-            # Fix 2: If content doesn't start with '[', add it
-            if not content.startswith('['):
-                content = '[' + content
-                print(f"  • Added missing opening bracket")
+            # Additional debugging for failed parsing
+            print(f"  • First 50 chars: {content[:50].decode(errors='replace')}...")
+            print(f"  • Last 50 chars: ...{content[-50:].decode(errors='replace')}")
             
-            # Fix 3: If content doesn't end with ']', add it
-            if not content.endswith(']'):
-                # Find the last closing bracket
-                match = re.search(r']([^]]*?)$', content)
-                if match:
-                    content = content[:match.start() + 1]
-                    print(f"  • Removed {len(match.group(1))} trailing characters after JSON")
-                else:
-                    content = content + ']'
-                    print(f"  • Added missing closing bracket")
+            # Try aggressive repair by extracting what looks like valid JSON
+            # This looks for a pattern of arrays inside arrays
+            matches = _DOUBLE_BRACKET_RE.findall(content)
+            if matches:
+                print(f"  • Found {len(matches)} potential coordinate arrays")
+                for match in matches[:2]:  # Show just the first 2
+                    print(f"  • Example: {match[:30].decode()}...")
             
-            # Fix 4: Remove any trailing '%' characters
-            if '%' in content:
-                content = content.replace('%', '')
-                print(f"  • Removed '%' character(s)")
+            return None
             
-            # Try to parse the fixed content
-            try:
-                data = json.loads(content)
-                print(f"✅ Hour {hour:02d}: Successfully parsed {len(data)} coordinates")
-                return data
-            except json.JSONDecodeError as e:
-                print(f"❌ Hour {hour:02d}: JSON parsing failed: {e}")
-                
-                # Additional debugging for failed parsing
-                print(f"  • First 50 chars: {content[:50]}...")
-                print(f"  • Last 50 chars: ...{content[-50:]}")
-                
-                # Try aggressive repair by extracting what looks like valid JSON
-                # This looks for a pattern of arrays inside arrays
-                matches = re.findall(r'\[\s*\[\s*[-0-9.]+\s*,\s*[-0-9.]+\s*,\s*[-0-9.]+\s*\]\s*\]', content)
-                if matches:
-                    print(f"  • Found {len(matches)} potential coordinate arrays")
-                    for match in matches[:2]:  # Show just the first 2
-                        print(f"  • Example: {match[:30]}...")
-                
-                return None
-                
     except Exception as e:
         print(f"❌ Hour {hour:02d}: Error - {str(e)}")
         return None
@@ -88,11 +99,10 @@ async def main():
     print(f"Base URL: {BASE_URL}")
     
     # Fetch and fix data for all hours
-    all_data = {}
-    for hour in range(24):
-        data = await fetch_and_fix_json(hour)
-        if data:
-            all_data[hour] = data
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        tasks = [fetch_and_fix_json(hour, client) for hour in range(24)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    all_data = {hour: data for hour, data in enumerate(results) if data and not isinstance(data, Exception)}
     
     # Summary
     print(f"\nSUMMARY: Successfully processed {len(all_data)}/24 hours")
@@ -100,12 +110,19 @@ async def main():
     
     # Save the fixed data to a single file
     fixed_file = "fixed_balloon_data.json"
-    with open(fixed_file, 'w') as f:
-        json.dump(all_data, f)
+    async with aiofiles.open(fixed_file, 'wb') as f:
+        await f.write(orjson.dumps(all_data, option=orjson.OPT_NON_STR_KEYS))
     print(f"Fixed data saved to {fixed_file}")
 
 if __name__ == "__main__":
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    else:
+        # Use the faster libuv-based loop when uvloop is installed
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
     
     asyncio.run(main()) 
\ No newline at end of file
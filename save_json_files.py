@@ -5,6 +5,7 @@ This script saves each response to a separate file for easier examination.
 """
 
 import os
+import aiofiles
 import httpx
 import asyncio
 import sys
@@ -14,23 +15,22 @@ from datetime import datetime
 BASE_URL = "https://a.windbornesystems.com/treasure"
 OUTPUT_DIR = "raw_json_files"
 
-async def fetch_and_save(hour):
+async def fetch_and_save(hour, client):
     """Fetch data for a specific hour and save raw content to a file"""
     url = f"{BASE_URL}/{hour:02d}.json"
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{OUTPUT_DIR}/{timestamp}_{hour:02d}.json"
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            print(f"Fetching {url}...")
-            response = await client.get(url)
-            
-            # Save the raw content
-            with open(filename, 'w') as f:
-                f.write(response.text)
-            
-            print(f"✅ Hour {hour:02d}: Status {response.status_code}, saved to {filename}")
-            return True
+        print(f"Fetching {url}...")
+        response = await client.get(url)
+        
+        # Save the raw bytes without blocking the other in-flight fetches
+        async with aiofiles.open(filename, 'wb') as f:
+            await f.write(response.content)
+        
+        print(f"✅ Hour {hour:02d}: Status {response.status_code}, saved to {filename}")
+        return True
     except Exception as e:
         print(f"❌ Hour {hour:02d}: Error - {str(e)}")
         return False
@@ -44,8 +44,9 @@ async def main():
     print(f"Raw JSON files will be saved to: {os.path.abspath(OUTPUT_DIR)}")
     
     # Fetch all hours
-    tasks = [fetch_and_save(hour) for hour in range(24)]
-    results = await asyncio.gather(*tasks)
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        tasks = [fetch_and_save(hour, client) for hour in range(24)]
+        results = await asyncio.gather(*tasks)
     
     # Summary
     success_count = sum(1 for r in results if r)
@@ -55,5 +56,12 @@ async def main():
 if __name__ == "__main__":
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    else:
+        # Use the faster libuv-based loop when uvloop is installed
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
     
     asyncio.run(main()) 
\ No newline at end of file
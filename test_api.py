@@ -13,7 +13,7 @@ import sys
 # Base URL for the WindBorne API
 BASE_URL = "https://a.windbornesystems.com/treasure"
 
-async def fetch_raw_data(hour):
+async def fetch_raw_data(hour, client):
     """
     Fetch raw data for a specific hour, returning the status code,
     raw content, and attempt to parse it as JSON
@@ -21,30 +21,29 @@ async def fetch_raw_data(hour):
     url = f"{BASE_URL}/{hour:02d}.json"
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(url)
-            status_code = response.status_code
-            raw_content = response.text
-            
-            # Try to parse JSON but don't throw exception if it fails
-            parsed_json = None
-            json_error = None
+        response = await client.get(url)
+        status_code = response.status_code
+        raw_content = response.text
+        
+        # Try to parse JSON but don't throw exception if it fails
+        parsed_json = None
+        json_error = None
+        
+        try:
+            parsed_json = response.json()
+        except json.JSONDecodeError as e:
+            json_error = str(e)
             
-            try:
-                parsed_json = response.json()
-            except json.JSONDecodeError as e:
-                json_error = str(e)
-                
-            return {
-                "hour": hour,
-                "url": url,
-                "status_code": status_code,
-                "content_length": len(raw_content),
-                "raw_content": raw_content,
-                "json_parsed": parsed_json is not None,
-                "json_error": json_error,
-                "parsed_json": parsed_json
-            }
+        return {
+            "hour": hour,
+            "url": url,
+            "status_code": status_code,
+            "content_length": len(raw_content),
+            "raw_content": raw_content,
+            "json_parsed": parsed_json is not None,
+            "json_error": json_error,
+            "parsed_json": parsed_json
+        }
     except Exception as e:
         return {
             "hour": hour,
@@ -126,8 +125,9 @@ async def main():
     print(f"Base URL: {BASE_URL}")
     
     # Fetch all hours
-    tasks = [fetch_raw_data(hour) for hour in range(24)]
-    results = await asyncio.gather(*tasks)
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        tasks = [fetch_raw_data(hour, client) for hour in range(24)]
+        results = await asyncio.gather(*tasks)
     
     # Summary
     fetch_success = sum(1 for r in results if "status_code" in r)
@@ -144,5 +144,12 @@ async def main():
 if __name__ == "__main__":
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    else:
+        # Use the faster libuv-based loop when uvloop is installed
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
     
     asyncio.run(main()) 
\ No newline at end of file
@@ -5,46 +5,20 @@ This script uses a robust approach that directly extracts the coordinate arrays
 regardless of the overall formatting problems.
 """
 
-import json
+import aiofiles
 import httpx
+import json
+import orjson
 import asyncio
 import sys
-import re
 from datetime import datetime
 
+from app.parsing import drop_non_finite, extract_coordinates, load_json
+
 # Base URL for the WindBorne API
 BASE_URL = "https://a.windbornesystems.com/treasure"
 
-def extract_coordinates_from_text(text):
-    """
-    Extract all valid coordinates from text using regex pattern matching.
-    This bypasses JSON parsing errors by directly finding patterns that match
-    the expected coordinate format.
-    """
-    # Pattern to match [float, float, float] coordinate triplets
-    # This handles numbers with/without decimal places and negative numbers
-    pattern = r'\[\s*([-+]?\d*\.?\d+)\s*,\s*([-+]?\d*\.?\d+)\s*,\s*([-+]?\d*\.?\d+)\s*\]'
-    
-    matches = re.findall(pattern, text)
-    coordinates = []
-    
-    for match in matches:
-        try:
-            # Convert string matches to floats
-            lat = float(match[0])
-            lng = float(match[1])
-            alt = float(match[2])
-            
-            # Validate coordinates
-            if -90 <= lat <= 90 and -180 <= lng <= 180 and alt > 0:
-                coordinates.append([lat, lng, alt])
-        except ValueError:
-            # Skip any conversion errors
-            pass
-    
-    return coordinates
-
-async def fetch_and_extract_coordinates(hour):
+async def fetch_and_extract_coordinates(hour, client):
     """
     Fetch data for a specific hour and extract valid coordinates,
     even if the JSON is malformed
@@ -52,37 +26,39 @@ async def fetch_and_extract_coordinates(hour):
     url = f"{BASE_URL}/{hour:02d}.json"
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            print(f"Fetching {url}...")
-            response = await client.get(url)
-            
-            if response.status_code != 200:
-                print(f"❌ Hour {hour:02d}: HTTP error {response.status_code}")
-                return None
-            
-            # Get the raw text content
-            raw_content = response.text
-            
-            # First try to parse as normal JSON
-            try:
-                data = json.loads(raw_content)
-                if isinstance(data, list) and all(isinstance(item, list) and len(item) == 3 for item in data):
-                    print(f"✅ Hour {hour:02d}: Successfully parsed as valid JSON: {len(data)} coordinates")
-                    return data
-            except json.JSONDecodeError:
-                # JSON parsing failed, fall back to regex extraction
-                pass
-            
-            # Extract coordinates using regex
-            coordinates = extract_coordinates_from_text(raw_content)
+        print(f"Fetching {url}...")
+        response = await client.get(url)
+        
+        if response.status_code != 200:
+            print(f"❌ Hour {hour:02d}: HTTP error {response.status_code}")
+            return None
+        
+        # Work on the raw bytes; decoding the body to text is never needed
+        raw_bytes = response.content
+        
+        # First try to parse as normal JSON
+        try:
+            data = load_json(raw_bytes)
+            if isinstance(data, list) and all(isinstance(item, list) and len(item) == 3 for item in data):
+                finite_data = drop_non_finite(data)
+                if len(finite_data) < len(data):
+                    print(f"  • Dropped {len(data) - len(finite_data)} coordinates with NaN/Infinity values")
+                print(f"✅ Hour {hour:02d}: Successfully parsed as valid JSON: {len(finite_data)} coordinates")
+                return finite_data
+        except json.JSONDecodeError:
+            # JSON parsing failed, fall back to regex extraction
+            pass
+        
+        # Extract coordinates using regex
+        coordinates = extract_coordinates(raw_bytes)
+        
+        if coordinates:
+            print(f"✅ Hour {hour:02d}: Extracted {len(coordinates)} coordinates using regex")
+            return coordinates
+        else:
+            print(f"❌ Hour {hour:02d}: Failed to extract any valid coordinates")
+            return None
             
-            if coordinates:
-                print(f"✅ Hour {hour:02d}: Extracted {len(coordinates)} coordinates using regex")
-                return coordinates
-            else:
-                print(f"❌ Hour {hour:02d}: Failed to extract any valid coordinates")
-                return None
-                
     except Exception as e:
         print(f"❌ Hour {hour:02d}: Error - {str(e)}")
         return None
@@ -92,11 +68,10 @@ async def main():
     print(f"Base URL: {BASE_URL}")
     
     # Fetch and extract coordinates for all hours
-    all_data = {}
-    for hour in range(24):
-        data = await fetch_and_extract_coordinates(hour)
-        if data:
-            all_data[str(hour).zfill(2)] = data
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        tasks = [fetch_and_extract_coordinates(hour, client) for hour in range(24)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    all_data = {str(hour).zfill(2): data for hour, data in enumerate(results) if data and not isinstance(data, Exception)}
     
     # Summary
     print(f"\nSUMMARY: Successfully processed {len(all_data)}/24 hours")
@@ -104,8 +79,8 @@ async def main():
     
     # Save the fixed data to a single file
     fixed_file = "fixed_balloon_data.json"
-    with open(fixed_file, 'w') as f:
-        json.dump(all_data, f)
+    async with aiofiles.open(fixed_file, 'wb') as f:
+        await f.write(orjson.dumps(all_data))
     print(f"Fixed data saved to {fixed_file}")
     
     # Create a simpler summary file that can be easily loaded
@@ -116,12 +91,19 @@ async def main():
         "coordinates_per_hour": {hour: len(coords) for hour, coords in all_data.items()},
         "last_updated": datetime.now().isoformat()
     }
-    with open(summary_file, 'w') as f:
-        json.dump(summary, f)
+    async with aiofiles.open(summary_file, 'wb') as f:
+        await f.write(orjson.dumps(summary))
     print(f"Summary data saved to {summary_file}")
 
 if __name__ == "__main__":
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    else:
+        # Use the faster libuv-based loop when uvloop is installed
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
     
     asyncio.run(main()) 
\ No newline at end of file